@@ -6,20 +6,53 @@ PROYECTO: Synapse V4.6 (Módulo Social & Difusión)
 PLATAFORMA: Termux (Android)
 ARQUITECTO: Gemini AI
 DESCRIPCIÓN: Agente autónomo que genera informes con Groq (Llama-3),
-             los guarda en YAML, hace backup en GitHub y publica en X (Twitter).
+             los guarda en JSON Lines, hace backup en GitHub y publica en X (Twitter).
 """
 
 import os
 import sys
-import yaml
+import asyncio
+import json
 import datetime
 import subprocess
 import tweepy
 from groq import Groq
 
 # --- CONFIGURACIÓN Y CONSTANTES ---
-ARCHIVO_LOG = "agenda.yaml"
+ARCHIVO_LOG = "agenda.jsonl" # Una entrada JSON por línea (solo se añade)
 MODELO_IA = "llama-3.1-8b-instant" # Modelo rápido y eficiente para Termux
+MAX_TOKENS_IA = 120 # Tope duro con margen: en español con emojis un token da < 4 caracteres
+LIMITE_TWEET = 280
+
+# --- CLIENTES (se crean una sola vez y se reutilizan entre llamadas) ---
+_groq_client = None
+_tweepy_client = None
+
+def _groq():
+    global _groq_client
+    if _groq_client is None:
+        api_key = os.getenv("GROQ_API_KEY")
+        if api_key:
+            _groq_client = Groq(api_key=api_key)
+    return _groq_client
+
+def _tweepy():
+    global _tweepy_client
+    if _tweepy_client is None:
+        # Recuperar claves del entorno (.bashrc)
+        ck = os.getenv("X_API_KEY")
+        cs = os.getenv("X_API_SECRET")
+        at = os.getenv("X_ACCESS_TOKEN")
+        ats = os.getenv("X_ACCESS_SECRET")
+        if all([ck, cs, at, ats]):
+            # Autenticación Cliente V2
+            _tweepy_client = tweepy.Client(
+                consumer_key=ck,
+                consumer_secret=cs,
+                access_token=at,
+                access_token_secret=ats
+            )
+    return _tweepy_client
 
 # --- 1. MÓDULO DE DATOS (INPUT) ---
 def obtener_datos_entorno():
@@ -33,16 +66,24 @@ def obtener_datos_entorno():
     return datos
 
 # --- 2. MÓDULO DE INTELIGENCIA (GROQ) ---
+def _recortar_a_frase(texto):
+    """Recorta un texto truncado a la última frase completa (o palabra)"""
+    texto = texto.rstrip()
+    fin = max(texto.rfind(c) for c in ".!?")
+    if fin > 0:
+        return texto[:fin + 1]
+    espacio = texto.rfind(" ")
+    return texto[:espacio].rstrip() + "…" if espacio > 0 else texto
+
 def generar_informe_ia(contexto):
     print(">> 🧠 Consultando a Groq (Llama-3)...")
-    api_key = os.getenv("GROQ_API_KEY")
+    client = _groq()
     
-    if not api_key:
+    if client is None:
         print("❌ ERROR: No se detectó GROQ_API_KEY.")
         return "Error: Sin API Key de Groq."
 
     try:
-        client = Groq(api_key=api_key)
         chat_completion = client.chat.completions.create(
             messages=[
                 {
@@ -55,15 +96,21 @@ def generar_informe_ia(contexto):
                 }
             ],
             model=MODELO_IA,
+            max_tokens=MAX_TOKENS_IA,
         )
-        return chat_completion.choices[0].message.content
+        eleccion = chat_completion.choices[0]
+        texto = eleccion.message.content
+        if eleccion.finish_reason == "length":
+            # Groq cortó por el tope de tokens: no publicar media palabra
+            texto = _recortar_a_frase(texto)
+        return texto
     except Exception as e:
         print(f"❌ Error en Groq: {e}")
         return f"Error generando informe: {e}"
 
-# --- 3. MÓDULO DE MEMORIA (YAML) ---
-def guardar_log_yaml(informe):
-    print(">> 💾 Guardando en agenda.yaml...")
+# --- 3. MÓDULO DE MEMORIA (JSONL) ---
+def guardar_log(informe):
+    print(f">> 💾 Guardando en {ARCHIVO_LOG}...")
     entrada = {
         "fecha": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "evento": "Informe Diario V4.6",
@@ -71,52 +118,30 @@ def guardar_log_yaml(informe):
     }
     
     try:
-        # Si no existe, crea una lista vacía
-        if not os.path.exists(ARCHIVO_LOG):
-            with open(ARCHIVO_LOG, 'w') as f:
-                yaml.dump([], f)
-
-        # Leer contenido actual
-        with open(ARCHIVO_LOG, 'r') as f:
-            data = yaml.safe_load(f) or []
-
-        # Añadir nueva entrada y guardar
-        data.append(entrada)
-        with open(ARCHIVO_LOG, 'w') as f:
-            yaml.dump(data, f, default_flow_style=False, allow_unicode=True)
-            
+        # Añadir = escribir una línea; leer = json.loads() línea a línea
+        with open(ARCHIVO_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+
     except Exception as e:
-        print(f"⚠️ Error guardando YAML: {e}")
+        print(f"⚠️ Error guardando log: {e}")
 
 # --- 4. MÓDULO DE DIFUSIÓN (TWITTER/X API V2) ---
 def publicar_en_x(texto_informe):
     print("\n>> 🐦 Iniciando protocolo de difusión en X...")
     
-    # Recuperar claves del entorno (.bashrc)
-    ck = os.getenv("X_API_KEY")
-    cs = os.getenv("X_API_SECRET")
-    at = os.getenv("X_ACCESS_TOKEN")
-    ats = os.getenv("X_ACCESS_SECRET")
+    client = _tweepy()
 
     # Verificación de integridad
-    if not all([ck, cs, at, ats]):
+    if client is None:
         print("❌ ERROR CRÍTICO: Faltan credenciales de Twitter en variables de entorno.")
         return
 
     try:
-        # Autenticación Cliente V2
-        client = tweepy.Client(
-            consumer_key=ck,
-            consumer_secret=cs,
-            access_token=at,
-            access_token_secret=ats
-        )
-        
         # Lógica de recorte de seguridad (Hard limit 280 chars)
         tweet = texto_informe
-        if len(tweet) > 280:
+        if len(tweet) > LIMITE_TWEET:
             print(f"✂️ Recortando tweet ({len(tweet)} chars)...")
-            tweet = texto_informe[:275] + "..."
+            tweet = texto_informe[:LIMITE_TWEET - 3] + "…"
             
         # Publicación
         response = client.create_tweet(text=tweet)
@@ -131,14 +156,24 @@ def publicar_en_x(texto_informe):
 def git_push_automatico():
     print("\n>> 🚀 Iniciando Git Push...")
     try:
-        subprocess.run(["git", "add", "."], check=True)
-        subprocess.run(["git", "commit", "-m", f"Synapse Auto-Update {datetime.datetime.now()}"], check=True)
-        subprocess.run(["git", "push"], check=True)
+        # add + commit + push en un solo proceso hijo; el mensaje va como $1
+        mensaje = f"Synapse Auto-Update {datetime.datetime.now()}"
+        subprocess.run(
+            ["sh", "-c", 'git add . && git commit -m "$1" && git push', "sh", mensaje],
+            check=True,
+        )
         print("✅ Git Push completado.")
     except subprocess.CalledProcessError as e:
         print(f"⚠️ Error en Git: {e}")
 
 # --- ORQUESTADOR PRINCIPAL ---
+async def difundir_y_respaldar(informe):
+    """Tweet y git push no dependen uno del otro: se lanzan a la vez"""
+    await asyncio.gather(
+        asyncio.to_thread(publicar_en_x, informe),
+        asyncio.to_thread(git_push_automatico),
+    )
+
 def main():
     print("--- 🤖 INICIANDO SYNAPSE V4.6 ---")
     
@@ -150,13 +185,10 @@ def main():
     print(f"\n📄 Informe Generado:\n{informe}\n")
     
     # 3. Guardar en Log Local
-    guardar_log_yaml(informe)
-    
-    # 4. Publicar en Redes (NUEVO)
-    publicar_en_x(informe)
+    guardar_log(informe)
     
-    # 5. Backup en Nube
-    git_push_automatico()
+    # 4 + 5. Publicar en Redes y Backup en Nube (en paralelo)
+    asyncio.run(difundir_y_respaldar(informe))
     
     print("\n--- ✅ CICLO TERMINADO ---")
 
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+cache_http.py — Caché en disco para GET condicionales
+------------------------------------------------------
+- Guarda por URL el cuerpo y sus validadores (ETag / Last-Modified)
+- Dentro del TTL devuelve el cuerpo guardado sin tocar la red
+- Pasado el TTL revalida con If-None-Match / If-Modified-Since;
+  un 304 reutiliza el cuerpo guardado (no se descarga ni se re-parsea)
+- Vale tanto para requests.Session.get como para httpx.get
+- titulares_rss(): primeros títulos de un feed RSS/Atom apoyado en la caché
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+CACHE_DIR = Path(__file__).with_name(".cache_http")
+TTL_POR_DEFECTO = 300
+
+
+def _rutas(url: str) -> Tuple[Path, Path]:
+    h = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return CACHE_DIR / f"{h}.json", CACHE_DIR / f"{h}.body"
+
+
+def _cargar(url: str) -> Optional[Dict[str, Any]]:
+    meta_path, body_path = _rutas(url)
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        meta["body"] = body_path.read_bytes()
+        return meta
+    except (OSError, ValueError):
+        return None
+
+
+def _guardar_meta(url: str, etag: Optional[str], last_modified: Optional[str]):
+    meta_path, _ = _rutas(url)
+    meta_path.write_text(
+        json.dumps({
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "ts": time.time(),
+        }),
+        encoding="utf-8",
+    )
+
+
+def _guardar(url: str, resp: Any):
+    _, body_path = _rutas(url)
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        body_path.write_bytes(resp.content)
+        _guardar_meta(url, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+    except OSError:
+        # La caché es un extra: si no se puede escribir, seguimos sin ella
+        pass
+
+
+def cached_get(
+    get: Callable[..., Any],
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    ttl: float = TTL_POR_DEFECTO,
+    **kwargs: Any,
+) -> bytes:
+    """
+    GET de `url` con `get` (SESSION.get, httpx.get...) apoyado en la caché.
+    Devuelve el cuerpo en bytes; los errores HTTP se propagan con
+    raise_for_status() como en una petición normal.
+    """
+    meta = _cargar(url)
+    if meta and time.time() - meta.get("ts", 0) < ttl:
+        return meta["body"]
+
+    headers = dict(headers or {})
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    resp = get(url, headers=headers, **kwargs)
+
+    if meta and resp.status_code == 304:
+        try:
+            _guardar_meta(url, meta.get("etag"), meta.get("last_modified"))
+        except OSError:
+            pass
+        return meta["body"]
+
+    resp.raise_for_status()
+    _guardar(url, resp)
+    return resp.content
+
+
+def _tag_local(el: ET.Element) -> str:
+    return el.tag.rsplit("}", 1)[-1]
+
+
+def titulares_rss(
+    get: Callable[..., Any],
+    url: str,
+    n: int,
+    headers: Optional[Dict[str, str]] = None,
+    **kwargs: Any,
+) -> List[str]:
+    """
+    Primeros `n` títulos de un feed RSS/Atom descargado con cached_get.
+    Solo interesa <item>/<entry> → <title>: iterparse y cortamos en n
+    (sin feedparser ni árbol completo en memoria).
+    """
+    titulares: List[str] = []
+    if n <= 0:
+        # Nada que leer: ni siquiera se descarga el feed
+        return titulares
+
+    contenido = cached_get(get, url, headers=headers, **kwargs)
+
+    for _, el in ET.iterparse(io.BytesIO(contenido), events=("end",)):
+        if _tag_local(el) not in ("item", "entry"):
+            continue
+        for hijo in el:
+            if _tag_local(hijo) == "title" and hijo.text:
+                titulares.append(hijo.text.strip())
+                break
+        el.clear()
+        if len(titulares) >= n:
+            break
+
+    return titulares
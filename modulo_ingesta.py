@@ -1,7 +1,12 @@
 import requests
-import feedparser
-import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache_http import titulares_rss
+from opcionales import json_loads
 
 # --- CONFIGURACIÓN ---
 TIMEOUT_SEC = 20
@@ -15,6 +20,39 @@ HEADERS = {
     'Referer': 'https://finance.yahoo.com/'
 }
 
+def _crear_sesion():
+    """Una sola sesión para todo el módulo: reutiliza TCP+TLS entre peticiones"""
+    sesion = requests.Session()
+    reintentos = Retry(
+        total=2,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+    )
+    adaptador = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=reintentos)
+    sesion.mount("https://", adaptador)
+    return sesion
+
+SESSION = _crear_sesion()
+
+class LimitadorTasa:
+    """Token bucket mínimo: como mucho `rps` peticiones por segundo"""
+    def __init__(self, rps):
+        self.intervalo = 1.0 / rps
+        self.siguiente = 0.0
+        self.lock = threading.Lock()
+
+    def esperar(self):
+        # Solo duerme si la petición anterior fue hace menos de `intervalo`
+        with self.lock:
+            ahora = time.monotonic()
+            espera = self.siguiente - ahora
+            self.siguiente = max(ahora, self.siguiente) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+LIMITE_YAHOO = LimitadorTasa(5)
+
 def obtener_datos_manuales(ticker):
     """
     Petición 'artesanal' al endpoint de gráficos (v8).
@@ -25,16 +63,15 @@ def obtener_datos_manuales(ticker):
     url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?interval=1d&range=5d"
     
     try:
-        # Pausa táctica para no saturar
-        time.sleep(1)
+        # Ritmo máximo hacia Yahoo para no saturar
+        LIMITE_YAHOO.esperar()
         
-        session = requests.Session()
-        response = session.get(url, headers=HEADERS, timeout=TIMEOUT_SEC)
+        response = SESSION.get(url, headers=HEADERS, timeout=TIMEOUT_SEC)
         
         if response.status_code != 200:
             return None
             
-        data = response.json()
+        data = json_loads(response.content)
         
         # 1. Extracción de Precios
         result = data['chart']['result'][0]
@@ -52,9 +89,8 @@ def obtener_datos_manuales(ticker):
         actividad = "NORMAL"
         if len(volumenes) >= 2:
             vol_hoy = volumenes[-1]
-            # Calculamos la media de los días anteriores (sin contar hoy)
-            vol_anteriores = volumenes[:-1]
-            media_vol = sum(vol_anteriores) / len(vol_anteriores) if vol_anteriores else vol_hoy
+            # Media de los días anteriores (sin contar hoy), sin copiar la lista
+            media_vol = (sum(volumenes) - vol_hoy) / (len(volumenes) - 1)
             
             # Lógica: Si el volumen de hoy supera en 50% al promedio -> Ballenas
             if vol_hoy > (media_vol * 1.5):
@@ -105,6 +141,10 @@ def generar_tablero_manual():
             
     return "\n".join(reporte)
 
+def leer_titulares_rss(url, n):
+    """Primeros n títulos de un feed RSS/Atom (iterparse, sin feedparser)"""
+    return titulares_rss(SESSION.get, url, n, headers={'User-Agent': HEADERS['User-Agent']}, timeout=TIMEOUT_SEC)
+
 def obtener_noticias_google():
     """RSS Google (Micro y Macro)"""
     queries = [
@@ -115,9 +155,9 @@ def obtener_noticias_google():
     for label, q in queries:
         try:
             url = f"https://news.google.com/rss/search?q={q}+when:2d&hl=en-US&gl=US&ceid=US:en"
-            feed = feedparser.parse(url)
-            if feed.entries:
-                news_report.append(f"📰 {label}: {feed.entries[0].title}")
+            titulares = leer_titulares_rss(url, 1)
+            if titulares:
+                news_report.append(f"📰 {label}: {titulares[0]}")
         except: pass
     return "\n".join(news_report) if news_report else "(Sin noticias)"
 
@@ -126,9 +166,9 @@ def obtener_reddit_resiliente():
     headers = {'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X)'}
     url = "https://www.reddit.com/search.json?q=NuScale+SMR+stock&sort=new&limit=3"
     try:
-        r = requests.get(url, headers=headers, timeout=10)
+        r = SESSION.get(url, headers=headers, timeout=10)
         if r.status_code == 200:
-            posts = r.json()['data']['children']
+            posts = json_loads(r.content)['data']['children']
             validos = [f"- r/{p['data']['subreddit']}: {p['data']['title']}" for p in posts][:2]
             return "\n".join(validos)
     except: pass
@@ -136,9 +176,14 @@ def obtener_reddit_resiliente():
 
 def obtener_datos_reales():
     """FACADE V5.5 MANUAL OVERRIDE"""
-    tablero = generar_tablero_manual()
-    noticias = obtener_noticias_google()
-    social = obtener_reddit_resiliente()
+    # Las tres fuentes son independientes: se consultan a la vez
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        f_tablero = ex.submit(generar_tablero_manual)
+        f_noticias = ex.submit(obtener_noticias_google)
+        f_social = ex.submit(obtener_reddit_resiliente)
+        tablero = f_tablero.result()
+        noticias = f_noticias.result()
+        social = f_social.result()
     
     return (
         f"=== INFORME V5.5 (MANUAL) ===\n"
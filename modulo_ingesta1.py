@@ -2,18 +2,26 @@
 # -*- coding: utf-8 -*-
 
 import os
-import json
-import time
 import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
-import requests
-import feedparser
+import httpx
 from urllib.parse import quote
 
+from cache_http import titulares_rss
+from opcionales import HTTP2, json_dumps_pretty, json_loads
+
 SNAPSHOT_FILE = "ultimo_snapshot.json"
 
+HTTP_TIMEOUT = 8
+YF_JSON_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Linux; Android 11; SynapseBot/5.6)"
+}
+
 TICKERS = [
     "SMR",
     "URA",
@@ -52,96 +60,193 @@ class SnapshotMercado:
     rss_titulares: List[str]
 
 
-def fetch_with_retry(url: str, params=None, max_reintentos=3, timeout=8):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Linux; Android 11; SynapseBot/5.6)"
-    }
+async def fetch_with_retry(client: httpx.AsyncClient, url: str, params=None, max_reintentos=3):
     backoff = 1.5
 
     for intento in range(1, max_reintentos + 1):
         try:
-            resp = requests.get(url, params=params, timeout=timeout, headers=headers)
+            resp = await client.get(url, params=params)
 
             if resp.status_code == 429:
                 print("⛔ 429 Too Many Requests")
-                raise requests.HTTPError("429 Too Many Requests")
+                raise httpx.HTTPStatusError(
+                    "429 Too Many Requests", request=resp.request, response=resp
+                )
 
             resp.raise_for_status()
             return resp
 
-        except (requests.ConnectionError, requests.Timeout):
+        except httpx.TransportError:
+            # Conexión, timeout, reset o error de protocolo: se reintenta
             print(f"🌐 Reintento {intento}/{max_reintentos}")
             if intento == max_reintentos:
                 raise
-            time.sleep(backoff ** intento + random.uniform(0, 0.5))
+            await asyncio.sleep(backoff ** intento + random.uniform(0, 0.5))
 
-        except requests.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             print(f"⚠️ HTTP Error: {e}")
             raise
 
 
-def _extraer_campo_embebido(html: str, campo: str, entero: bool = False):
-    pattern = f'"{campo}":{{"raw":'
-    i = html.find(pattern)
-    if i == -1:
-        return None
+# Yahoo clásico: todo el estado de la página en un único blob JS
+_APP_MAIN = "root.App.main = "
+# Yahoo actual (SvelteKit): respuestas de la API v7 incrustadas en
+# <script type="application/json" data-sveltekit-fetched data-url="...">
+_SVELTE_QUOTE = 'data-url="https://query1.finance.yahoo.com/v7/finance/quote?'
 
-    j = i + len(pattern)
-    k = j
 
-    while k < len(html) and html[k] not in ",}":
-        k += 1
+def _cotizacion_embebida(html: str, sym: str) -> Optional[Dict[str, Any]]:
+    i = html.find(_APP_MAIN)
+    if i != -1:
+        j = html.find("};\n", i)
+        try:
+            data = json_loads(html[i + len(_APP_MAIN):j + 1])
+            return data["context"]["dispatcher"]["stores"]["QuoteSummaryStore"]["price"]
+        except Exception:
+            pass
 
-    valor = html[j:k].strip()
+    pos = 0
+    while True:
+        i = html.find(_SVELTE_QUOTE, pos)
+        if i == -1:
+            return None
+        ini = html.find(">", i) + 1
+        fin = html.find("</script>", ini)
+        if fin == -1:
+            return None
+        pos = fin
 
-    try:
-        if entero:
-            return int(float(valor))
-        return float(valor)
-    except:
-        return None
+        try:
+            envoltorio = json_loads(html[ini:fin])
+            resultados = json_loads(envoltorio["body"])["quoteResponse"]["result"]
+        except Exception:
+            continue
+
+        for item in resultados:
+            if item.get("symbol") == sym:
+                return item
+
+
+def _valor_raw(cotizacion: Dict[str, Any], campo: str):
+    valor = cotizacion.get(campo)
+    if isinstance(valor, dict):
+        valor = valor.get("raw")
+    return valor
+
+
+async def _leer_html_yahoo(client: httpx.AsyncClient, sym: str) -> Tuple[str, str]:
+    encoded = quote(sym, safe="")
+    url = f"https://finance.yahoo.com/quote/{encoded}"
+
+    print(f"🌐 Leyendo {sym} ...")
+    resp = await fetch_with_retry(client, url)
+    return sym, resp.text
+
+
+async def _leer_json_yahoo(client: httpx.AsyncClient, tickers: List[str]) -> Dict[str, Dict[str, Any]]:
+    print(f"🌐 Leyendo {', '.join(tickers)} (JSON v7) ...")
+    resp = await fetch_with_retry(client, YF_JSON_URL, params={"symbols": ",".join(tickers)})
+    resultados = json_loads(resp.content)["quoteResponse"]["result"]
+    return {item["symbol"]: item for item in resultados if item.get("symbol") in tickers}
+
+
+async def _leer_yahoo(tickers: List[str]) -> Dict[str, Any]:
+    """
+    Índices (^TNX, ^VIX) → una sola petición JSON v7; acciones/ETFs → HTML.
+    Todo a la vez sobre un único pool de conexiones. Los índices que el
+    JSON no devuelva caen al HTML dentro de su propia tarea, solapados
+    con las acciones.
+    Devuelve {sym: cotización (dict) | html (str) | excepción}.
+    """
+    indices = [s for s in tickers if s.startswith("^")]
+    acciones = [s for s in tickers if not s.startswith("^")]
+
+    n = max(1, len(tickers))
+    limites = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+
+    async with httpx.AsyncClient(
+        http2=HTTP2,
+        timeout=HTTP_TIMEOUT,
+        headers=HEADERS,
+        limits=limites,
+        follow_redirects=True,
+    ) as client:
+        async def _indices():
+            # JSON v7 y, para los índices que no devuelva (o si falla, p.ej.
+            # 401 por crumb), su HTML aquí mismo: así el respaldo corre a la
+            # vez que las acciones y no en una segunda ronda.
+            if not indices:
+                return {}
+            try:
+                por_json: Dict[str, Any] = await _leer_json_yahoo(client, indices)
+            except Exception:
+                por_json = {}
+            faltan = [s for s in indices if s not in por_json]
+            htmls = await asyncio.gather(
+                *(_leer_html_yahoo(client, sym) for sym in faltan),
+                return_exceptions=True,
+            )
+            for sym, r in zip(faltan, htmls):
+                por_json[sym] = r if isinstance(r, BaseException) else r[1]
+            return por_json
+
+        por_indices, *htmls = await asyncio.gather(
+            _indices(),
+            *(_leer_html_yahoo(client, sym) for sym in acciones),
+            return_exceptions=True,
+        )
+
+    if isinstance(por_indices, BaseException):
+        por_indices = {sym: por_indices for sym in indices}
+
+    out: Dict[str, Any] = dict(por_indices)
+    for sym, r in zip(acciones, htmls):
+        out[sym] = r if isinstance(r, BaseException) else r[1]
+    return out
 
 
 def obtener_cotizaciones_yahoo_html(tickers: List[str]) -> Dict[str, Dict[str, Any]]:
     resultados = {}
+    leidos = asyncio.run(_leer_yahoo(tickers))
 
     for sym in tickers:
-        encoded = quote(sym, safe="")
-        url = f"https://finance.yahoo.com/quote/{encoded}"
-
-        print(f"🌐 Leyendo {sym} ...")
-        resp = fetch_with_retry(url)
-        html = resp.text
+        r = leidos[sym]
+        if isinstance(r, BaseException):
+            raise r
 
-        price = _extraer_campo_embebido(html, "regularMarketPrice")
-        change_pct = _extraer_campo_embebido(html, "regularMarketChangePercent")
-        vol = _extraer_campo_embebido(html, "regularMarketVolume", entero=True)
+        cotizacion = (_cotizacion_embebida(r, sym) or {}) if isinstance(r, str) else r
+        price = _valor_raw(cotizacion, "regularMarketPrice")
+        change_pct = _valor_raw(cotizacion, "regularMarketChangePercent")
+        vol = _valor_raw(cotizacion, "regularMarketVolume")
 
         resultados[sym] = {
             "price": price or 0.0,
             "change_pct": change_pct or 0.0,
-            "volume": vol or 0
+            "volume": int(vol) if vol else 0
         }
 
     return resultados
 
 
+def leer_titulares_rss(url: str, n: int) -> List[str]:
+    return titulares_rss(
+        httpx.get, url, n, headers=HEADERS, timeout=HTTP_TIMEOUT, follow_redirects=True
+    )
+
+
 def obtener_titulares_rss(max_items=3):
     titulares = []
     for url in RSS_FEEDS:
         try:
-            feed = feedparser.parse(url)
-            for entry in feed.entries[:max_items]:
-                if "title" in entry:
-                    titulares.append(entry["title"])
+            titulares.extend(leer_titulares_rss(url, max_items - len(titulares)))
         except:
             pass
     return titulares[:max_items]
 
 
 def guardar_snapshot(snapshot: SnapshotMercado):
-    with open(SNAPSHOT_FILE, "w", encoding="utf-8") as f:
-        json.dump(asdict(snapshot), f, ensure_ascii=False, indent=2)
+    with open(SNAPSHOT_FILE, "wb") as f:
+        f.write(json_dumps_pretty(asdict(snapshot)))
     print("💾 Snapshot guardado.")
 
 
@@ -149,14 +254,37 @@ def cargar_snapshot():
     if not os.path.exists(SNAPSHOT_FILE):
         return None
     try:
-        with open(SNAPSHOT_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(SNAPSHOT_FILE, "rb") as f:
+            data = json_loads(f.read())
         print("♻️ Usando snapshot local.")
         return SnapshotMercado(**data)
     except:
         return None
 
 
+def _precargar_snapshot():
+    """
+    Pide al kernel que vaya leyendo el snapshot a la page cache (WILLNEED).
+    No bloquea: si luego hay que tirar de cargar_snapshot(), la lectura
+    ya no espera al almacenamiento.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(SNAPSHOT_FILE, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+_precargar_snapshot()
+
+
 def formatear_contexto_llm(s: SnapshotMercado):
     origen = "DATOS EN VIVO" if not s.usando_cache else "DATOS RECICLADOS"
     return (
@@ -175,8 +303,11 @@ def obtener_datos_reales():
     from datetime import datetime
 
     try:
-        data = obtener_cotizaciones_yahoo_html(TICKERS)
-        rss = obtener_titulares_rss()
+        # El RSS no depende de Yahoo: se lee en paralelo a las cotizaciones
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            f_rss = ex.submit(obtener_titulares_rss)
+            data = obtener_cotizaciones_yahoo_html(TICKERS)
+            rss = f_rss.result()
 
         snap = SnapshotMercado(
             timestamp=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"),
@@ -4,25 +4,30 @@
 """
 modulo_ingesta_v5.py — Versión estable y limpia
 ------------------------------------------------
-- Intenta JSON (API v7)
-- Si no funciona → HTML fallback (fin-streamer + JSON embebido)
+- Intenta JSON (API v7), una sola petición para todos los tickers
+- Solo los tickers que el JSON no resuelve → HTML fallback
+  (fin-streamer + JSON embebido), descargando las páginas en paralelo
+  (asyncio + httpx)
 - Si no funciona → snapshot
 - Compatible con obtener_datos_reales()
 - Incluye modo debug (--debug-html)
-- Maneja correctamente respuestas gzip (JSON + HTML)
+- La descompresión (gzip/deflate/br) la hace httpx
 """
 
 from __future__ import annotations
 
-import json
+import asyncio
 import sys
 import time
 import re
-import gzip
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional
-from urllib import parse, request, error as urlerror
+from urllib import parse, error as urlerror
+
+import httpx
+
+from opcionales import HTTP2, json_dumps_pretty, json_loads
 
 
 # =============================
@@ -37,10 +42,22 @@ YF_HTML_URL = "https://finance.yahoo.com/quote"
 SNAPSHOT_PATH = Path(__file__).with_name("ultimo_snapshot_v5.json")
 
 HTTP_TIMEOUT = 8
+HTML_MAX_CONCURRENCY = 8
+HTTP_HEADERS = {"User-Agent": "SynapseV5-Termux"}
 RETRIES = 2
 RETRY_SLEEP = 2
 
 
+# Cliente keep-alive compartido por las llamadas síncronas: tras la
+# primera petición a cada host ya no se repite el handshake TLS.
+_CLIENT = httpx.Client(
+    http2=HTTP2,
+    timeout=HTTP_TIMEOUT,
+    headers=HTTP_HEADERS,
+    follow_redirects=True,
+)
+
+
 # =============================
 # TIPOS
 # =============================
@@ -49,7 +66,8 @@ class IngestaError(Exception):
     pass
 
 
-@dataclass
+# slots=True (Python 3.10+): sin __dict__ por instancia
+@dataclass(slots=True)
 class QuoteData:
     symbol: str
     price: Optional[float]
@@ -60,63 +78,20 @@ class QuoteData:
     source: str
 
 
-# =============================
-# UTILIDAD HTTP (gzip-safe)
-# =============================
-
-def decode_http_body(content: bytes, headers: Dict[str, Any]) -> str:
-    """
-    Decodifica el cuerpo HTTP:
-    - Si viene como gzip → lo descomprime.
-    - Si no, intenta decodificar como UTF-8 ignorando errores.
-    Robustez extra: aunque el header no diga gzip, si los primeros bytes
-    tienen la firma de gzip, intenta descomprimir igualmente.
-    """
-    encoding = (headers.get("Content-Encoding") or "").lower()
-
-    # Caso 1: el servidor indica gzip
-    if "gzip" in encoding:
-        try:
-            return gzip.decompress(content).decode("utf-8", errors="ignore")
-        except Exception:
-            # Si falla la descompresión, seguimos probando con decode directo
-            pass
-
-    # Caso 2: no indica gzip pero la firma es de gzip
-    if content[:2] == b"\x1f\x8b":
-        try:
-            return gzip.decompress(content).decode("utf-8", errors="ignore")
-        except Exception:
-            pass
-
-    # Caso 3: texto plano (o algo que al menos decodifica)
-    return content.decode("utf-8", errors="ignore")
-
-
 # =============================
 # RED — JSON
 # =============================
 
-def fetch_json(symbols: List[str]) -> Dict[str, Any]:
-    query = parse.urlencode({"symbols": ",".join(symbols)})
-    url = f"{YF_JSON_URL}?{query}"
-
+def fetch_json(symbols: List[str]) -> bytes:
+    params = {"symbols": ",".join(symbols)}
     last_exc = None
 
     for _ in range(RETRIES):
         try:
-            req = request.Request(
-                url,
-                headers={
-                    "User-Agent": "SynapseV5-Termux",
-                    "Accept-Encoding": "gzip, deflate, br",
-                },
-            )
-            with request.urlopen(req, timeout=HTTP_TIMEOUT) as resp:
-                if resp.status != 200:
-                    raise IngestaError(f"HTTP {resp.status}")
-                text = decode_http_body(resp.read(), resp.headers)
-                return json.loads(text)
+            resp = _CLIENT.get(YF_JSON_URL, params=params)
+            if resp.status_code != 200:
+                raise IngestaError(f"HTTP {resp.status_code}")
+            return resp.content
         except Exception as e:
             last_exc = e
             time.sleep(RETRY_SLEEP)
@@ -124,8 +99,9 @@ def fetch_json(symbols: List[str]) -> Dict[str, Any]:
     raise IngestaError(f"JSON fallo: {last_exc}")
 
 
-def parse_json(raw: Dict[str, Any]) -> Dict[str, QuoteData]:
-    results = raw.get("quoteResponse", {}).get("result", [])
+def parse_json(raw: bytes) -> Dict[str, QuoteData]:
+    # orjson parsea los bytes tal cual, sin decodificar antes a str
+    results = json_loads(raw).get("quoteResponse", {}).get("result", [])
     if not results:
         raise IngestaError("JSON sin resultados")
 
@@ -158,18 +134,10 @@ def fetch_html(symbol: str) -> str:
 
     for _ in range(RETRIES):
         try:
-            req = request.Request(
-                url,
-                headers={
-                    "User-Agent": "SynapseV5-Termux",
-                    "Accept-Encoding": "gzip, deflate, br",
-                },
-            )
-            with request.urlopen(req, timeout=HTTP_TIMEOUT) as resp:
-                if resp.status != 200:
-                    raise IngestaError(f"HTTP {resp.status}")
-                text = decode_http_body(resp.read(), resp.headers)
-                return text
+            resp = _CLIENT.get(url)
+            if resp.status_code != 200:
+                raise IngestaError(f"HTTP {resp.status_code}")
+            return resp.text
         except Exception as e:
             last_exc = e
             time.sleep(RETRY_SLEEP)
@@ -177,61 +145,120 @@ def fetch_html(symbol: str) -> str:
     raise IngestaError(f"HTML fallo: {last_exc}")
 
 
-def extract_float(pat: str, html: str) -> Optional[float]:
-    m = re.search(pat, html)
-    if not m:
+async def fetch_html_async(client: httpx.AsyncClient, symbol: str) -> str:
+    url = f"{YF_HTML_URL}/{parse.quote(symbol)}"
+    last_exc = None
+
+    for _ in range(RETRIES):
+        try:
+            resp = await client.get(url)
+            if resp.status_code != 200:
+                raise IngestaError(f"HTTP {resp.status_code}")
+            return resp.text
+        except Exception as e:
+            last_exc = e
+            await asyncio.sleep(RETRY_SLEEP)
+
+    raise IngestaError(f"HTML fallo: {last_exc}")
+
+
+# Patrones compilados una sola vez. Cada <fin-streamer ...> se trocea en
+# atributos (en cualquier orden) en una sola pasada lineal, sin .+? que
+# pueda saltar de una etiqueta a otra.
+_FIN_STREAMER_RE = re.compile(r"<fin-streamer\b([^>]*)>")
+_ATTR_RE = re.compile(r'([\w:-]+)="([^"]*)"')
+_FIN_FIELDS = frozenset(
+    ("regularMarketPrice", "regularMarketChangePercent", "regularMarketVolume")
+)
+# JSON embebido: los cinco campos en una sola alternancia con un grupo
+# con nombre por campo, para recorrer la página (~2 MB) una vez y no cinco.
+_EMBED_RE = re.compile(
+    r'"regularMarketPrice"\s*:\s*{\s*"raw":\s*(?P<price>[0-9eE.\-]+)'
+    r'|"regularMarketChangePercent"\s*:\s*{\s*"raw":\s*(?P<chg>[0-9eE.\-]+)'
+    r'|"regularMarketVolume"\s*:\s*(?P<vol>[0-9]+)'
+    r'|"currency"\s*:\s*"(?P<curr>[A-Z]{3})"'
+    r'|"regularMarketTime"\s*:\s*(?P<time>[0-9]+)'
+)
+
+
+def to_float(value: Optional[str]) -> Optional[float]:
+    if value is None:
         return None
     try:
-        return float(m.group(1))
+        return float(value)
     except Exception:
         return None
 
 
-def extract_int(pat: str, html: str) -> Optional[int]:
-    m = re.search(pat, html)
-    if not m:
+def to_int(value: Optional[str]) -> Optional[int]:
+    if value is None:
         return None
     try:
-        return int(m.group(1))
+        return int(value)
     except Exception:
         return None
 
 
-def parse_html(sym: str, html: str) -> QuoteData:
-    esc = re.escape(sym)
+def scan_embedded(html: str, wanted: set) -> Dict[str, str]:
+    """
+    {grupo: valor} con la primera aparición de cada grupo de `wanted`
+    en el JSON embebido; corta en cuanto los tiene todos.
+    """
+    out: Dict[str, str] = {}
+    for m in _EMBED_RE.finditer(html):
+        name = m.lastgroup
+        if name in wanted and name not in out:
+            out[name] = m.group(name)
+            if len(out) == len(wanted):
+                break
+    return out
+
 
+def index_fin_streamers(html: str, default_symbol: Optional[str] = None) -> Dict[str, Dict[str, str]]:
+    """
+    {símbolo: {campo: valor}} con la primera aparición de cada par.
+    Los fin-streamer sin data-symbol son los de la propia página y se
+    asignan a `default_symbol`.
+    """
+    out: Dict[str, Dict[str, str]] = {}
+    for m in _FIN_STREAMER_RE.finditer(html):
+        attrs = dict(_ATTR_RE.findall(m.group(1)))
+        field = attrs.get("data-field")
+        if field not in _FIN_FIELDS:
+            continue
+        sym = attrs.get("data-symbol", default_symbol)
+        value = attrs.get("data-value", attrs.get("value"))
+        if sym is None or value is None:
+            continue
+        out.setdefault(sym, {}).setdefault(field, value.replace(",", ""))
+    return out
+
+
+def parse_html(sym: str, html: str) -> QuoteData:
     # 1) fin-streamer
-    price = extract_float(
-        rf'data-symbol="{esc}".+?data-field="regularMarketPrice".+?value="([0-9eE.\-]+)"',
-        html,
-    )
-    chg = extract_float(
-        rf'data-symbol="{esc}".+?data-field="regularMarketChangePercent".+?value="([0-9eE.\-]+)"',
-        html,
-    )
-    vol = extract_int(
-        rf'data-symbol="{esc}".+?data-field="regularMarketVolume".+?value="([0-9]+)"',
-        html,
-    )
+    fields = index_fin_streamers(html, default_symbol=sym).get(sym, {})
+    price = to_float(fields.get("regularMarketPrice"))
+    chg = to_float(fields.get("regularMarketChangePercent"))
+    vol = to_int(fields.get("regularMarketVolume"))
 
-    # 2) JSON embebido
+    # 2) JSON embebido (una sola pasada para lo que falte)
+    wanted = {"curr", "time"}
     if price is None:
-        price = extract_float(
-            r'"regularMarketPrice"\s*:\s*{\s*"raw":\s*([0-9eE.\-]+)', html
-        )
+        wanted.add("price")
     if chg is None:
-        chg = extract_float(
-            r'"regularMarketChangePercent"\s*:\s*{\s*"raw":\s*([0-9eE.\-]+)', html
-        )
+        wanted.add("chg")
     if vol is None:
-        vol = extract_int(r'"regularMarketVolume"\s*:\s*([0-9]+)', html)
-
-    curr = None
-    m_c = re.search(r'"currency"\s*:\s*"([A-Z]{3})"', html)
-    if m_c:
-        curr = m_c.group(1)
+        wanted.add("vol")
+    embed = scan_embedded(html, wanted)
 
-    as_of = extract_int(r'"regularMarketTime"\s*:\s*([0-9]+)', html)
+    if price is None:
+        price = to_float(embed.get("price"))
+    if chg is None:
+        chg = to_float(embed.get("chg"))
+    if vol is None:
+        vol = to_int(embed.get("vol"))
+    curr = embed.get("curr")
+    as_of = to_int(embed.get("time"))
 
     return QuoteData(
         symbol=sym,
@@ -244,11 +271,50 @@ def parse_html(sym: str, html: str) -> QuoteData:
     )
 
 
+async def fetch_html_one(
+    client: httpx.AsyncClient, sem: asyncio.Semaphore, sym: str
+) -> QuoteData:
+    # Se parsea en cuanto llega la página, mientras las demás siguen en vuelo
+    async with sem:
+        html = await fetch_html_async(client, sym)
+    return parse_html(sym, html)
+
+
+async def _fetch_html_all(symbols: List[str]) -> List[Any]:
+    n = max(1, min(HTML_MAX_CONCURRENCY, len(symbols)))
+    limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+    sem = asyncio.Semaphore(n)
+
+    async with httpx.AsyncClient(
+        http2=HTTP2,
+        timeout=HTTP_TIMEOUT,
+        headers=HTTP_HEADERS,
+        limits=limits,
+        follow_redirects=True,
+    ) as client:
+        return await asyncio.gather(
+            *(fetch_html_one(client, sem, sym) for sym in symbols),
+            return_exceptions=True,
+        )
+
+
 def fetch_html_quotes(symbols: List[str]) -> Dict[str, QuoteData]:
+    """
+    Devuelve solo los tickers cuya página se pudo descargar; si no se
+    pudo ninguno, lanza IngestaError.
+    """
+    results = asyncio.run(_fetch_html_all(symbols))
+
     out: Dict[str, QuoteData] = {}
-    for sym in symbols:
-        html = fetch_html(sym)
-        out[sym] = parse_html(sym, html)
+    last_exc = None
+    for sym, q in zip(symbols, results):
+        if isinstance(q, BaseException):
+            last_exc = q
+            continue
+        out[sym] = q
+
+    if not out and symbols:
+        raise IngestaError(f"HTML fallo: {last_exc}")
     return out
 
 
@@ -257,16 +323,28 @@ def fetch_html_quotes(symbols: List[str]) -> Dict[str, QuoteData]:
 # =============================
 
 def save_snapshot(quotes: Dict[str, QuoteData]):
-    SNAPSHOT_PATH.write_text(
-        json.dumps({k: asdict(v) for k, v in quotes.items()}, indent=2)
-    )
+    # Proyección directa de los campos (mismo JSON que asdict, sin su
+    # introspección ni deepcopy por entrada)
+    payload = {
+        k: {
+            "symbol": v.symbol,
+            "price": v.price,
+            "change_pct": v.change_pct,
+            "volume": v.volume,
+            "currency": v.currency,
+            "as_of": v.as_of,
+            "source": v.source,
+        }
+        for k, v in quotes.items()
+    }
+    SNAPSHOT_PATH.write_bytes(json_dumps_pretty(payload))
 
 
 def load_snapshot() -> Optional[Dict[str, QuoteData]]:
     if not SNAPSHOT_PATH.exists():
         return None
     try:
-        raw = json.loads(SNAPSHOT_PATH.read_text())
+        raw = json_loads(SNAPSHOT_PATH.read_bytes())
         out: Dict[str, QuoteData] = {}
         for sym, q in raw.items():
             out[sym] = QuoteData(
@@ -287,31 +365,40 @@ def load_snapshot() -> Optional[Dict[str, QuoteData]]:
 # CONTEXTO LLM
 # =============================
 
+# (umbral, divisor, sufijo), de mayor a menor
+_VOL_BUCKETS = ((1_000_000, 1_000_000.0, "M"), (1000, 1000.0, "K"))
+
+
 def fmt_vol(v):
     if v is None:
         return "N/A"
-    if v > 1_000_000:
-        return f"{v/1_000_000:.2f}M"
-    if v > 1000:
-        return f"{v/1000:.2f}K"
-    return str(v)
+    if v <= 1000:
+        return str(v)
+    for thr, div, suf in _VOL_BUCKETS:
+        if v > thr:
+            return f"{v / div:.2f}{suf}"
+    return str(v)  # NaN y similares no cumplen ninguna comparación
 
 
 def generate_context(quotes: Dict[str, QuoteData], fuente: str) -> str:
     ts = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-    out: List[str] = [
-        "[Synapse V5 — Datos de mercado]",
-        f"Fuente: {fuente}",
-        f"Timestamp: {ts}",
-        "",
-    ]
-
-    for sym, q in quotes.items():
-        out.append(
-            f"{sym}: "
-            f"{q.price if q.price is not None else 'N/A'} "
-            f"(Δ {q.change_pct if q.change_pct is not None else 'N/A'} %, "
-            f"Vol {fmt_vol(q.volume)}, src {q.source})"
+    out: List[Optional[str]] = [None] * (len(quotes) + 4)
+    out[0] = "[Synapse V5 — Datos de mercado]"
+    out[1] = f"Fuente: {fuente}"
+    out[2] = f"Timestamp: {ts}"
+    out[3] = ""
+
+    NA = "N/A"
+    vol_fmt = fmt_vol
+    for i, (sym, q) in enumerate(quotes.items(), start=4):
+        p = q.price
+        c = q.change_pct
+        out[i] = "%s: %s (Δ %s %%, Vol %s, src %s)" % (
+            sym,
+            NA if p is None else p,
+            NA if c is None else c,
+            vol_fmt(q.volume),
+            q.source,
         )
 
     return "\n".join(out)
@@ -321,28 +408,74 @@ def generate_context(quotes: Dict[str, QuoteData], fuente: str) -> str:
 # API PUBLICA
 # =============================
 
+# Orden en el que se listan las fuentes mezcladas en "Fuente: ..."
+_ORDEN_FUENTES = ("live_json", "live_html", "snapshot", "sin_datos")
+
+
 def obtener_datos_detallados(symbols=None):
     if symbols is None:
         symbols = TICKERS_POR_DEFECTO
 
-    # JSON
+    quotes: Dict[str, QuoteData] = {}
+
+    # JSON (una petición para todos)
     try:
-        raw = fetch_json(symbols)
-        quotes = parse_json(raw)
-        save_snapshot(quotes)
-        fuente = "live_json"
+        quotes = parse_json(fetch_json(symbols))
     except Exception:
-        # HTML
+        pass
+
+    # HTML solo para los que faltan o vienen sin precio
+    pendientes = [
+        s for s in symbols if s not in quotes or quotes[s].price is None
+    ]
+    if pendientes:
         try:
-            quotes = fetch_html_quotes(symbols)
-            save_snapshot(quotes)
-            fuente = "live_html"
+            html_quotes = fetch_html_quotes(pendientes)
         except Exception:
-            snap = load_snapshot()
-            if not snap:
-                raise IngestaError("Sin JSON, sin HTML y sin snapshot")
-            quotes = snap
-            fuente = "snapshot"
+            html_quotes = {}
+        for sym, q in html_quotes.items():
+            if sym not in quotes or q.price is not None:
+                quotes[sym] = q
+
+    # Solo lo que llegó en vivo y con precio cuenta como dato fresco
+    vivos = {sym: q for sym, q in quotes.items() if q.price is not None}
+    snap = None
+    if any(sym not in vivos for sym in symbols):
+        snap = load_snapshot() or {}
+        if not vivos and not snap:
+            raise IngestaError("Sin JSON, sin HTML y sin snapshot")
+
+    # Cada ticker pedido aparece siempre: en vivo, del snapshot o, si no
+    # hay nada, sin precio (evaluar_sensores lo cuenta como "precio ausente")
+    final: Dict[str, QuoteData] = {}
+    for sym in symbols:
+        q = vivos.get(sym)
+        if q is None and snap:
+            q = snap.get(sym)
+            if q is not None and q.price is None:
+                q = None
+        if q is None:
+            q = quotes.get(sym) or QuoteData(
+                symbol=sym,
+                price=None,
+                change_pct=None,
+                volume=None,
+                currency=None,
+                as_of=None,
+                source="sin_datos",
+            )
+        final[sym] = q
+    quotes = final
+
+    # El snapshot se fusiona: un run parcial no borra los tickers que faltan
+    if vivos:
+        if snap is None:
+            snap = load_snapshot() or {}
+        snap.update(vivos)
+        save_snapshot(snap)
+
+    presentes = {q.source for q in quotes.values()}
+    fuente = "+".join(f for f in _ORDEN_FUENTES if f in presentes)
 
     return generate_context(quotes, fuente), quotes, {"fuente": fuente}
 
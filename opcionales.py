@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+opcionales.py — Dependencias opcionales compartidas por las ingestas
+--------------------------------------------------------------------
+- HTTP2: True si está instalado h2 (httpx[http2])
+- json_loads / json_dumps_pretty: orjson si está disponible; si no,
+  el json de la stdlib con el mismo resultado
+"""
+
+import json
+from typing import Any
+
+try:
+    import h2  # noqa: F401  (httpx[http2])
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+
+
+def json_dumps_pretty(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
@@ -16,7 +16,7 @@ DESCRIPCIÓN:
 import os
 import sys
 import yaml
-import datetime
+import time
 import subprocess
 from typing import Optional
 
@@ -35,78 +35,110 @@ except ImportError:
 
 # --- CONFIGURACIÓN Y CONSTANTES ---
 ARCHIVO_LOG = "agenda.yaml"
+# Emisor C (libyaml) si está disponible; si no, el puro Python
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 MODELO_IA = "llama-3.3-70b-versatile"  # Modelo Groq actual para análisis
 
+# Clientes de API: se crean una sola vez por proceso y se reutilizan
+# (cada construcción monta su propio pool HTTP y contexto TLS).
+_GROQ_CLIENT: Optional[Groq] = None
+_TWEEPY_CLIENT: Optional[tweepy.Client] = None
+
+
+def _get_groq() -> Optional[Groq]:
+    global _GROQ_CLIENT
+    if _GROQ_CLIENT is None:
+        api_key = os.getenv("GROQ_API_KEY")
+        if api_key:
+            _GROQ_CLIENT = Groq(api_key=api_key)
+    return _GROQ_CLIENT
+
+
+def _get_tweepy() -> Optional[tweepy.Client]:
+    global _TWEEPY_CLIENT
+    if _TWEEPY_CLIENT is None:
+        ck = os.getenv("X_API_KEY")
+        cs = os.getenv("X_API_SECRET")
+        at = os.getenv("X_ACCESS_TOKEN")
+        ats = os.getenv("X_ACCESS_SECRET")
+        if all([ck, cs, at, ats]):
+            _TWEEPY_CLIENT = tweepy.Client(
+                consumer_key=ck,
+                consumer_secret=cs,
+                access_token=at,
+                access_token_secret=ats,
+            )
+    return _TWEEPY_CLIENT
+
 
 # --- 0. VALIDACIÓN BÁSICA DE ENTORNO ---
 
+# Variables imprescindibles: Groq + las cuatro credenciales de X
+_REQUIRED = (
+    "GROQ_API_KEY",
+    "X_API_KEY",
+    "X_API_SECRET",
+    "X_ACCESS_TOKEN",
+    "X_ACCESS_SECRET",
+)
+
+
 def validar_entorno():
     """
     Comprueba que existan las variables de entorno críticas.
     Si falta algo, salimos pronto para no gastar llamadas a APIs.
     """
-    errores = []
-
-    if not os.getenv("GROQ_API_KEY"):
-        errores.append("GROQ_API_KEY")
-
-    x_vars = [
-        "X_API_KEY",
-        "X_API_SECRET",
-        "X_ACCESS_TOKEN",
-        "X_ACCESS_SECRET",
-    ]
-    faltan_x = [v for v in x_vars if not os.getenv(v)]
-    if faltan_x:
-        errores.extend(faltan_x)
+    env = os.environ
+    errores = [v for v in _REQUIRED if not env.get(v)]
 
     if errores:
-        print("❌ ERROR: Faltan variables de entorno críticas:")
-        for v in errores:
-            print(f"   - {v}")
-        print("   Revisa tu ~/.bashrc o ~/.profile en Termux.")
+        print(
+            "❌ ERROR: Faltan variables de entorno críticas:\n"
+            + "\n".join(f"   - {v}" for v in errores)
+            + "\n   Revisa tu ~/.bashrc o ~/.profile en Termux."
+        )
         sys.exit(1)
 
 
 # --- 1. MÓDULO DE INTELIGENCIA (GROQ) ---
 
+# Prompt fijo de Synapse: se construye una vez al importar el módulo
+_SYSTEM_PROMPT = (
+    "Eres Synapse, una IA de análisis financiero de élite. "
+    "TU ESTILO: Cínico, directo, basado en datos (Data-Driven). "
+    "TU MISIÓN: Analizar el reporte de mercado que recibes. "
+    "REGLAS: "
+    "1. Si el volumen (Actividad) es alto, menciónalo como 'entrada de ballenas'. "
+    "2. Compara el precio real con los titulares de las noticias (busca contradicciones). "
+    "3. Usa emojis técnicos (☢️, 📉, 📈, 🏛️). "
+    "4. NO uses hashtags genéricos. Usa tickers como $SMR o $URA. "
+    "5. IMPORTANTE: Tu respuesta debe tener MENOS DE 280 CARACTERES."
+)
+_SYSTEM_MSG = {"role": "system", "content": _SYSTEM_PROMPT}
+_USER_TMPL = (
+    "DATOS EN TIEMPO REAL O SNAPSHOT:\n"
+    "%s\n\n"
+    "Analiza y escribe el tweet (<= 280 caracteres):"
+)
+
+
 def generar_informe_ia(contexto_mercado: str) -> Optional[str]:
     """
     Llama a Groq para generar el tweet-análisis.
     Si algo falla (API key, modelo, red…), devuelve None.
     """
     print(">> 🧠 Synapse procesando datos de mercado con Llama-3...")
-    api_key = os.getenv("GROQ_API_KEY")
+    client = _get_groq()
 
-    if not api_key:
+    if client is None:
         print("❌ ERROR: No se detectó GROQ_API_KEY.")
         return None
 
-    system_prompt = (
-        "Eres Synapse, una IA de análisis financiero de élite. "
-        "TU ESTILO: Cínico, directo, basado en datos (Data-Driven). "
-        "TU MISIÓN: Analizar el reporte de mercado que recibes. "
-        "REGLAS: "
-        "1. Si el volumen (Actividad) es alto, menciónalo como 'entrada de ballenas'. "
-        "2. Compara el precio real con los titulares de las noticias (busca contradicciones). "
-        "3. Usa emojis técnicos (☢️, 📉, 📈, 🏛️). "
-        "4. NO uses hashtags genéricos. Usa tickers como $SMR o $URA. "
-        "5. IMPORTANTE: Tu respuesta debe tener MENOS DE 280 CARACTERES."
-    )
-
     try:
-        client = Groq(api_key=api_key)
         chat_completion = client.chat.completions.create(
             messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": (
-                        "DATOS EN TIEMPO REAL O SNAPSHOT:\n"
-                        f"{contexto_mercado}\n\n"
-                        "Analiza y escribe el tweet (<= 280 caracteres):"
-                    ),
-                },
+                _SYSTEM_MSG,
+                {"role": "user", "content": _USER_TMPL % contexto_mercado},
             ],
             model=MODELO_IA,
             temperature=0.6,
@@ -122,25 +154,34 @@ def generar_informe_ia(contexto_mercado: str) -> Optional[str]:
 def guardar_log_yaml(informe: str) -> None:
     """
     Añade una entrada al log YAML (agenda.yaml) con timestamp e informe.
+    Solo escribe al final del fichero: coste O(1) aunque el log crezca.
     """
     print(">> 💾 Archivando análisis en agenda.yaml...")
     entrada = {
-        "fecha": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
         "evento": "Análisis Mercado V4.7",
         "contenido": informe,
     }
 
     try:
-        if not os.path.exists(ARCHIVO_LOG):
-            with open(ARCHIVO_LOG, "w", encoding="utf-8") as f:
-                yaml.dump([], f)
-
-        with open(ARCHIVO_LOG, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f) or []
-
-        data.append(entrada)
-        with open(ARCHIVO_LOG, "w", encoding="utf-8") as f:
-            yaml.dump(data, f, default_flow_style=False, allow_unicode=True)
+        # agenda.yaml es una lista YAML en bloque: cada entrada se añade
+        # como un "- ..." al final, sin leer ni reescribir el historial.
+        fragmento = yaml.dump(
+            [entrada],
+            Dumper=YAML_DUMPER,
+            default_flow_style=False,
+            allow_unicode=True,
+        )
+        with open(ARCHIVO_LOG, "a+", encoding="utf-8") as f:
+            # Versiones antiguas creaban el log vacío como "[]" (lista en
+            # flujo), que no admite items "- ..." detrás: se vacía sin
+            # parsear nada. Un fichero nuevo o con historial no se lee.
+            if 0 < f.tell() <= 4:
+                f.seek(0)
+                if f.read().strip() == "[]":
+                    f.seek(0)
+                    f.truncate()
+            f.write(fragmento)
 
     except Exception as e:
         print(f"⚠️ Error guardando YAML: {e}")
@@ -148,38 +189,34 @@ def guardar_log_yaml(informe: str) -> None:
 
 # --- 3. MÓDULO DE DIFUSIÓN (TWITTER/X API V2) ---
 
+# Borra comillas simples y dobles en una sola pasada (str.translate)
+_QUOTE_STRIP = str.maketrans("", "", "\"'")
+_ELLIPSIS = "..."
+
 def publicar_en_x(texto_informe: str) -> None:
     """
     Publica el informe en X (Twitter) usando la API v2 de Tweepy.
     """
     print("\n>> 🐦 Conectando con Neural Link (Twitter X)...")
 
-    ck = os.getenv("X_API_KEY")
-    cs = os.getenv("X_API_SECRET")
-    at = os.getenv("X_ACCESS_TOKEN")
-    ats = os.getenv("X_ACCESS_SECRET")
+    client = _get_tweepy()
 
-    if not all([ck, cs, at, ats]):
+    if client is None:
         print("❌ ERROR CRÍTICO: Faltan credenciales X_API_* en variables de entorno.")
         return
 
     try:
-        client = tweepy.Client(
-            consumer_key=ck,
-            consumer_secret=cs,
-            access_token=at,
-            access_token_secret=ats,
-        )
-
-        tweet = texto_informe.replace('"', "").replace("'", "")
+        tweet = texto_informe.translate(_QUOTE_STRIP)
 
-        if len(tweet) > 280:
-            print(f"✂️ Recortando tweet ({len(tweet)} chars)...")
-            tweet = tweet[:275] + "..."
+        n = len(tweet)
+        if n > 280:
+            print(f"✂️ Recortando tweet ({n} chars)...")
+            tweet = tweet[:275] + _ELLIPSIS
 
         response = client.create_tweet(text=tweet)
-        print(f"✅ TWEET ENVIADO. ID: {response.data['id']}")
-        print(f"📜 Contenido: {tweet}")
+        sys.stdout.write(
+            f"✅ TWEET ENVIADO. ID: {response.data['id']}\n📜 Contenido: {tweet}\n"
+        )
 
     except tweepy.errors.Forbidden:
         print("❌ Error 403: Tu App de Twitter no tiene permisos de ESCRITURA (Write).")
@@ -195,24 +232,26 @@ def git_push_automatico() -> None:
     Evita ruido y errores cuando no hay nada nuevo.
     """
     print("\n>> 🚀 Sincronizando memoria con la Nube (Git)...")
-    try:
-        status = subprocess.run(
-            ["git", "status", "--porcelain"],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        if not status.stdout.strip():
-            print("ℹ️ Sin cambios en el repo. No hay nada que commitear/pushear.")
-            return
-
-        subprocess.run(["git", "add", "."], check=True)
-        mensaje = f"Synapse V4.7 Data Update {datetime.datetime.now().strftime('%H:%M')}"
-        subprocess.run(["git", "commit", "-m", mensaje], check=True)
-        subprocess.run(["git", "push"], check=True)
+    mensaje = f"Synapse V4.7 Data Update {time.strftime('%H:%M')}"
+    # add + commit + push en un solo proceso hijo; el mensaje va como $1.
+    # Tras el add, "diff --cached" ve también los ficheros nuevos: si el
+    # índice queda vacío salimos con 3 ("sin cambios") sin commitear.
+    res = subprocess.run(
+        [
+            "sh",
+            "-c",
+            'git add . && if git diff --cached --quiet; then exit 3; fi'
+            ' && git commit -m "$1" && git push',
+            "sh",
+            mensaje,
+        ],
+    )
+    if res.returncode == 3:
+        print("ℹ️ Sin cambios en el repo. No hay nada que commitear/pushear.")
+    elif res.returncode:
+        print(f"⚠️ Error en Git: código de salida {res.returncode}")
+    else:
         print("✅ Git Push completado.")
-    except subprocess.CalledProcessError as e:
-        print(f"⚠️ Error en Git: {e}")
 
 
 # --- ORQUESTADOR PRINCIPAL ---
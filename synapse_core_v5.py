@@ -33,6 +33,22 @@ from modulo_ingesta_v5 import obtener_datos_detallados, QuoteData, IngestaError
 # 1) Sanity checks de datos de mercado
 # =====================================
 
+# Techo de precio por tipo de activo: símbolo -> (máximo, etiqueta del aviso)
+_RANGO_SMR = (500, "precio SMR fuera de rango")          # acción pequeña
+_RANGO_ETF = (1000, "precio ETF fuera de rango")         # ETFs
+# Índices/ratios: damos más margen pero cortamos por arriba
+_RANGO_INDICE = (100_000, "precio índice desproporcionado")
+
+_RANGO_POR_SIMBOLO: Dict[str, Tuple[float, str]] = {
+    "SMR": _RANGO_SMR,
+    "URA": _RANGO_ETF,
+    "URNM": _RANGO_ETF,
+    "XLU": _RANGO_ETF,
+    "^VIX": _RANGO_INDICE,
+    "^TNX": _RANGO_INDICE,
+}
+
+
 def evaluar_sensores(quotes: Dict[str, QuoteData]) -> Dict[str, Any]:
     """
     Aplica reglas sencillas para decidir si los datos son fiables.
@@ -48,6 +64,8 @@ def evaluar_sensores(quotes: Dict[str, QuoteData]) -> Dict[str, Any]:
     total = len(quotes)
     rotos = 0
     na_total = 0
+    cortado = False
+    hay_precio = False  # con un solo precio, "todos N/A" ya es imposible
 
     for sym, q in quotes.items():
         local_issues: List[str] = []
@@ -59,21 +77,13 @@ def evaluar_sensores(quotes: Dict[str, QuoteData]) -> Dict[str, Any]:
 
         # 2) Rango básico por tipo de activo
         if q.price is not None:
+            hay_precio = True
             if q.price <= 0:
                 local_issues.append(f"precio no positivo ({q.price})")
 
-            if sym == "SMR":
-                # SMR acción pequeña
-                if q.price > 500:
-                    local_issues.append(f"precio SMR fuera de rango ({q.price})")
-            elif sym in ("URA", "URNM", "XLU"):
-                # ETFs
-                if q.price > 1000:
-                    local_issues.append(f"precio ETF fuera de rango ({q.price})")
-            elif sym in ("^VIX", "^TNX"):
-                # Índices/ratios, damos más margen pero cortamos por arriba
-                if q.price > 100_000:
-                    local_issues.append(f"precio índice desproporcionado ({q.price})")
+            rango = _RANGO_POR_SIMBOLO.get(sym)
+            if rango is not None and q.price > rango[0]:
+                local_issues.append(f"{rango[1]} ({q.price})")
 
         # 3) Volumen negativo
         if q.volume is not None and q.volume < 0:
@@ -82,6 +92,11 @@ def evaluar_sensores(quotes: Dict[str, QuoteData]) -> Dict[str, Any]:
         if local_issues:
             rotos += 1
             motivos.append(f"{sym}: " + "; ".join(local_issues))
+            # Superado el umbral el KO ya es seguro; solo seguimos si aún
+            # puede faltar el aviso de "todos sin precio"
+            if rotos > total / 2 and hay_precio:
+                cortado = True
+                break
 
     # Regla global: si todos están sin precio -> KO directo
     if na_total == total:
@@ -89,8 +104,9 @@ def evaluar_sensores(quotes: Dict[str, QuoteData]) -> Dict[str, Any]:
 
     # Si más de la mitad tienen problemas -> KO
     if rotos > total / 2:
+        prefijo = "al menos " if cortado else ""
         motivos.append(
-            f"{rotos}/{total} tickers presentan anomalías (umbral > 50%)"
+            f"{prefijo}{rotos}/{total} tickers presentan anomalías (umbral > 50%)"
         )
 
     ok = not motivos
@@ -145,9 +161,11 @@ def publicar_en_x(tweet: str) -> None:
     (solo imprimir en consola).
     """
     # Ejemplo no-op:
-    print("\n=== [Simulación] Publicaría en X el siguiente tweet ===")
-    print(tweet)
-    print("=== [Fin simulación X] ===\n")
+    sys.stdout.write(
+        "\n=== [Simulación] Publicaría en X el siguiente tweet ===\n"
+        f"{tweet}\n"
+        "=== [Fin simulación X] ===\n\n"
+    )
 
     # TODO: copiar aquí tu lógica real con Tweepy.
 
@@ -173,16 +191,19 @@ def ejecutar_sesion_synapse_v5() -> int:
         sys.stderr.write(f"[Synapse V5] ERROR de ingesta: {e}\n")
         return 1
 
-    print("[Synapse V5] Contexto de mercado:\n")
-    print(contexto)
-
     # 2) Evaluar sensores
     eval_sensores = evaluar_sensores(quotes)
-    print("\n[Synapse V5] Estado de sensores:", eval_sensores["resumen"])
+
+    # Informe de contexto + sensores en una sola escritura a stdout
+    lineas = [
+        "[Synapse V5] Contexto de mercado:\n",
+        contexto,
+        "\n[Synapse V5] Estado de sensores: " + eval_sensores["resumen"],
+    ]
     if eval_sensores["motivos"]:
-        print("Detalles:")
-        for m in eval_sensores["motivos"]:
-            print("  -", m)
+        lineas.append("Detalles:")
+        lineas.extend("  - " + m for m in eval_sensores["motivos"])
+    sys.stdout.write("\n".join(lineas) + "\n")
 
     if not eval_sensores["ok"]:
         # Aquí puedes: